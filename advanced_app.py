@@ -14,13 +14,43 @@ GPT‑4.1) are not installed here. Use this file as a template for deployment on
 a local machine or Streamlit Community Cloud once the dependencies are resolved.
 """
 
+import io
+
 import streamlit as st
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
 
-from definitive_app import find_best_edges, discover_patterns_h2o, query_gpt4
+from definitive_app import clean_columns, find_best_edges, discover_patterns_h2o, query_gpt4
 from multicharts_helper import ma_crossover_strategy
 
 
+@st.cache_data(show_spinner=False)
+def _load_data(file_name: str, data: bytes) -> pd.DataFrame:
+    """Parse an uploaded file; cached on its bytes so reruns don't reparse it."""
+    buffer = io.BytesIO(data)
+    if file_name.lower().endswith(".xlsx"):
+        return pd.read_excel(buffer)
+    # pyarrow parses the CSV on multiple threads straight from the upload bytes,
+    # and the Arrow buffers are released while converting to pandas
+    table = pacsv.read_csv(pa.BufferReader(data))
+    df = table.to_pandas(split_blocks=True, self_destruct=True)
+    # Close is inferred rather than forced to float32, so markers such as 'n.a.'
+    # don't fail the upload; like parse_data_file, they are coerced and dropped
+    close_cols = df.columns[clean_columns(df.columns).str.lower() == "close"]
+    for col in close_cols:
+        df[col] = pd.to_numeric(df[col], errors="coerce").astype(np.float32)
+    return df.dropna(subset=close_cols).reset_index(drop=True)
+
+
+@st.cache_data(show_spinner=False)
+def _analyze(prices_bytes: bytes, fast_rng: tuple, slow_rng: tuple) -> list:
+    """Run the edge search; cached on the raw price bytes so widget reruns reuse it."""
+    prices = pd.Series(np.frombuffer(prices_bytes, dtype=np.float64))
+    return find_best_edges(prices, fast_rng, slow_rng)
+
+
 def main() -> None:
     """Run the Streamlit app."""
     st.title("MultiCharts Advanced Strategy Explorer")
@@ -41,10 +71,7 @@ def main() -> None:
     if uploaded_file is not None:
         # Load the uploaded data into a DataFrame
         try:
-            if uploaded_file.name.lower().endswith(".xlsx"):
-                df = pd.read_excel(uploaded_file)
-            else:
-                df = pd.read_csv(uploaded_file)
+            df = _load_data(uploaded_file.name, uploaded_file.getvalue())
         except Exception as exc:
             st.error(f"Errore nella lettura del file: {exc}")
             return
@@ -54,21 +81,19 @@ def main() -> None:
 
         # Placeholder calls for H2O and GPT‑4.1 integration
         discover_patterns_h2o(df)
+        # CSV keeps the prompt compact and machine-readable, unlike the padded to_string()
         query_gpt4(
             "Analizza il seguente dataframe per pattern e edge profittevoli:\n"
-            + df.head().to_string()
+            + df.head(5).to_csv(index=False, lineterminator="\n")
         )
 
         # Perform moving average crossover edge search
         st.subheader("Ricerca edge EMA")
         # Extract the Close price column from the DataFrame. MultiCharts exports usually
-      # include a column named 'Close' containing the closing prices used for backtesting.
-
-                close_cols = [
-            c for c in df.columns
-            if c.replace("<", "").replace(">", "").strip().lower() == "close"
-        ]    
-        if not close_cols:
+        # include a column named 'Close' (or '<Close>') containing the closing prices
+        # used for backtesting.
+        close_cols = df.columns[clean_columns(df.columns).str.lower() == "close"]
+        if close_cols.empty:
             # If no 'Close' column is found, inform the user and abort this analysis.
             st.error(
                 "La colonna 'Close' non è presente nel file. "
@@ -77,7 +102,8 @@ def main() -> None:
             return
         # Select the first matching column as the price series
         prices = df[close_cols[0]]
-        results = find_best_edges(prices, (range(5, 16)), (range(20, 41)))
+        prices_bytes = prices.to_numpy(dtype=np.float64).tobytes()
+        results = _analyze(prices_bytes, (5, 15), (20, 40))
         # Keep only the top 5 results for display
         results = results[:5]
 
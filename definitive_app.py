@@ -1,16 +1,36 @@
 # definitive_app.py
 import argparse
+import re
+import threading
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 # import matplotlib.pyplot as plt
 # Try to import matplotlib for plotting; fallback if unavailable
 try:
     import matplotlib.pyplot as plt
 except ImportError:
     plt = None
+# Try to import bottleneck for fast moving averages; fallback to NumPy sliding windows if unavailable
+try:
+    import bottleneck as bn
+except ImportError:
+    bn = None
+# Try to import numba to compile the backtest kernels; fallback to vectorized NumPy if unavailable
+try:
+    from numba import njit, prange
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+    prange = range
 
 
 def discover_patterns_h2o(dataframe):
@@ -27,25 +47,36 @@ def query_gpt4(prompt: str):
 
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class StrategyPerformance:
+    """Metrics of one (fast, slow) pair; ``equity`` is a float32 series, like the grid search prices."""
     fast_period: int
     slow_period: int
     total_return: float
     sharpe: float
-    equity: pd.Series
+    equity: Optional[pd.Series] = None
+
+def clean_columns(columns) -> pd.Index:
+    """Strip whitespace and MultiCharts' angle brackets, e.g. ``' <Close> '`` -> ``'Close'``."""
+    return pd.Index(columns).astype(str).str.replace(r'[<>]', '', regex=True).str.strip()
 
 def parse_data_file(file_path: Path) -> pd.DataFrame:
     ext = file_path.suffix.lower()
     if ext in ['.csv', '.txt']:
-        df = pd.read_csv(file_path)
+        # Read the header first so the single C-engine pass parses only the columns
+        # the analysis uses. Close is left untyped: malformed entries are coerced
+        # and dropped below instead of failing the whole file
+        header = pd.read_csv(file_path, nrows=0).columns
+        names = dict(zip(clean_columns(header), header))
+        usecols = [names[c] for c in ('Date', 'Time', 'Close') if c in names]
+        dtypes = {names[c]: str for c in ('Date', 'Time') if c in names}
+        df = pd.read_csv(file_path, engine='c', memory_map=True, usecols=usecols, dtype=dtypes)
     else:
         raw = pd.read_excel(file_path, header=None)
         rows = [str(cell).split(',') for cell in raw[0]]
-        header = [c.strip().strip('<>').strip() for c in rows[0]]
         data = rows[1:]
-        df = pd.DataFrame(data, columns=header)
-    df.columns = [c.strip().strip('<>').strip() for c in df.columns]
+        df = pd.DataFrame(data, columns=rows[0])
+    df.columns = clean_columns(df.columns)
     if 'Date' in df.columns and 'Time' in df.columns:
         df['DateTime'] = pd.to_datetime(df['Date'] + ' ' + df['Time'])
         df = df.set_index('DateTime').drop(columns=['Date','Time'])
@@ -59,64 +90,275 @@ def parse_data_file(file_path: Path) -> pd.DataFrame:
             pass
     if 'Close' not in df.columns:
         raise ValueError("Data must contain a 'Close' column")
-    if not np.issubdtype(df['Close'].dtype, np.number):
+    if not pd.api.types.is_numeric_dtype(df['Close']):
         df['Close'] = pd.to_numeric(df['Close'], errors='coerce')
     df = df.dropna(subset=['Close'])
     return df
 
+def _rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    # All NaN when the window never fills, like rolling(min_periods=window)
+    means = np.full(len(values), np.nan)
+    if window <= len(values):
+        if bn is not None:
+            means[:] = bn.move_mean(values, window=window, min_count=window)
+        else:
+            # Average a strided view of the windows (no copy of the prices)
+            means[window - 1:] = sliding_window_view(values, window).mean(axis=-1)
+    return means
+
 def moving_average_crossover_signals(prices: pd.Series, fast: int, slow: int) -> pd.Series:
-    fast_ma = prices.rolling(window=fast, min_periods=fast).mean()
-    slow_ma = prices.rolling(window=slow, min_periods=slow).mean()
-    signal = pd.Series(0, index=prices.index)
-    prev_fast = fast_ma.shift(1)
-    prev_slow = slow_ma.shift(1)
-    cross_up = (fast_ma > slow_ma) & (prev_fast <= prev_slow)
-    cross_down = (fast_ma < slow_ma) & (prev_fast >= prev_slow)
-    signal[cross_up] = 1
-    signal[cross_down] = 0
-    signal = signal.ffill().fillna(0)
-    return signal
+    arr = prices.to_numpy(dtype=np.float64, copy=False)
+    fast_ma = _rolling_mean(arr, fast)
+    slow_ma = _rolling_mean(arr, slow)
+    # One spread series instead of four shifted MA comparisons: a cross is a sign change
+    diff = fast_ma - slow_ma
+    cross_up = (diff[1:] > 0) & (diff[:-1] <= 0)
+    cross_down = (diff[1:] < 0) & (diff[:-1] >= 0)
+    signal = np.full(len(arr), np.nan)
+    signal[1:] = np.where(cross_up, 1.0, np.where(cross_down, 0.0, np.nan))
+    return pd.Series(signal, index=prices.index).ffill().fillna(0)
 
 def backtest_signals(prices: pd.Series, signal: pd.Series) -> pd.Series:
-    returns = prices.pct_change().fillna(0)
-    strategy_returns = returns * signal.shift(1).fillna(0)
-    return (1 + strategy_returns).cumprod()
+    arr = prices.to_numpy(dtype=np.float64)
+    sig = signal.to_numpy(dtype=np.float64)
+    # Bar returns and the one-bar signal lag written in place, instead of
+    # pct_change/shift/fillna Series
+    returns = np.empty_like(arr)
+    returns[:1] = 0.0
+    returns[1:] = arr[1:] / arr[:-1] - 1.0
+    # Bars next to a missing price earn nothing, as pct_change().fillna(0) did
+    returns[~np.isfinite(returns)] = 0.0
+    lagged = np.empty_like(sig)
+    lagged[:1] = 0.0
+    # A missing signal means flat, as shift(1).fillna(0) did
+    lagged[1:] = np.nan_to_num(sig[:-1], nan=0.0)
+    return pd.Series(np.cumprod(1.0 + returns * lagged), index=prices.index)
 
 def compute_performance(equity: pd.Series) -> Tuple[float, float]:
-    total_return = equity.iloc[-1] - 1
-    equity_returns = equity.pct_change().dropna()
-    sharpe = np.sqrt(252) * equity_returns.mean() / equity_returns.std() if equity_returns.std() != 0 else 0
+    arr = equity.to_numpy(dtype=np.float64)
+    total_return = arr[-1] - 1
+    equity_returns = np.diff(arr) / arr[:-1]
+    n = equity_returns.size
+    if n < 2:
+        return total_return, 0.0
+    # Mean and sample variance from the running sums, without pandas temporaries
+    mean = equity_returns.sum() / n
+    var = (np.dot(equity_returns, equity_returns) - n * mean * mean) / (n - 1)
+    sharpe = np.sqrt(252) * mean / np.sqrt(var) if var > 0 else 0.0
     return total_return, sharpe
 
-def find_best_edges(prices: pd.Series, fast_range: Tuple[int,int], slow_range: Tuple[int,int]) -> List[StrategyPerformance]:
+@njit(cache=True)
+def _all_smas(prices, wmin, wmax):
+    """Column ``w - wmin`` holds the ``w``-bar SMA of ``prices`` (NaN unless all ``w`` bars are valid).
+
+    Each window is a running sum updated in O(1) per bar: add the newest price
+    and drop the one that left the window. Non-finite prices are kept out of
+    the sum and counted instead, so the average recovers once they leave the
+    window, like ``rolling(min_periods=w)``.
+    """
+    n = prices.shape[0]
+    # Filled row-per-window and returned transposed, so every column stays contiguous
+    out = np.full((wmax - wmin + 1, n), np.nan, dtype=np.float32)
+    for col in range(wmax - wmin + 1):
+        w = wmin + col
+        if w > n:
+            break
+        # Accumulate in float64 so the running sum does not drift over long series
+        s = 0.0
+        valid = 0
+        for i in range(n):
+            if np.isfinite(prices[i]):
+                s += prices[i]
+                valid += 1
+            if i >= w and np.isfinite(prices[i - w]):
+                s -= prices[i - w]
+                valid -= 1
+            if valid == w:
+                out[col, i] = s / w
+    return out.T
+
+@njit(cache=True)
+def _eval_pair(prices, fast_ma, slow_ma, equity):
+    """Crossover signal, backtest and Sharpe in a single pass over the bars.
+
+    ``equity`` receives the equity curve when it has the same length as
+    ``prices``; pass an empty array to compute the scalar metrics only.
+    """
+    n = prices.shape[0]
+    if n == 0:
+        return 0.0, 0.0
+    keep_equity = equity.shape[0] == n
+    if keep_equity:
+        equity[0] = 1.0
+    position = 0.0
+    value = 1.0
+    total = 0.0
+    total_sq = 0.0
+    prev_diff = fast_ma[0] - slow_ma[0]
+    for i in range(1, n):
+        # Trade on the previous bar's signal, then update it with this bar's cross.
+        # A bar next to a missing price counts as a zero return, like pct_change().fillna(0)
+        bar_return = prices[i] / prices[i - 1] - 1.0
+        if not np.isfinite(bar_return):
+            bar_return = 0.0
+        r = position * bar_return
+        value *= 1.0 + r
+        total += r
+        total_sq += r * r
+        if keep_equity:
+            equity[i] = value
+        diff = fast_ma[i] - slow_ma[i]
+        if diff > 0 and prev_diff <= 0:
+            position = 1.0
+        elif diff < 0 and prev_diff >= 0:
+            position = 0.0
+        prev_diff = diff
+    count = n - 1
+    sharpe = 0.0
+    if count > 1:
+        mean = total / count
+        var = (total_sq - count * mean * mean) / (count - 1)
+        if var > 0:
+            sharpe = np.sqrt(252.0) * mean / np.sqrt(var)
+    return value - 1.0, sharpe
+
+def _all_smas_numpy(prices, wmin, wmax):
+    """Vectorized :func:`_all_smas` for when numba is missing: prefix sums instead of a Python loop."""
+    n = prices.shape[0]
+    finite = np.isfinite(prices)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(finite, prices, 0.0), dtype=np.float64)))
+    counts = np.concatenate(([0], np.cumsum(finite)))
+    out = np.full((n, wmax - wmin + 1), np.nan, dtype=np.float32, order='F')
+    for w in range(wmin, min(wmax, n) + 1):
+        full = counts[w:] - counts[:-w] == w
+        out[w - 1:, w - wmin] = np.where(full, (sums[w:] - sums[:-w]) / w, np.nan)
+    return out
+
+def _eval_pair_numpy(prices, fast_ma, slow_ma, equity):
+    """Vectorized :func:`_eval_pair` for when numba is missing; same inputs and results."""
+    n = prices.shape[0]
+    if n == 0:
+        return 0.0, 0.0
+    diff = fast_ma - slow_ma
+    cross_up = np.zeros(n, dtype=bool)
+    cross_down = np.zeros(n, dtype=bool)
+    cross_up[1:] = (diff[1:] > 0) & (diff[:-1] <= 0)
+    cross_down[1:] = (diff[1:] < 0) & (diff[:-1] >= 0)
+    # Forward-fill the last cross: bar 0 can never cross, so it doubles as "no cross yet"
+    last = np.maximum.accumulate(np.where(cross_up | cross_down, np.arange(n), 0))
+    position = cross_up[last]
+    bar_returns = (prices[1:] / prices[:-1]).astype(np.float64) - 1.0
+    bar_returns[~np.isfinite(bar_returns)] = 0.0
+    returns = bar_returns * position[:-1]
+    growth = np.cumprod(1.0 + returns)
+    if equity.shape[0] == n:
+        equity[0] = 1.0
+        equity[1:] = growth
+    count = n - 1
+    sharpe = 0.0
+    if count > 1:
+        mean = returns.sum() / count
+        var = (np.dot(returns, returns) - count * mean * mean) / (count - 1)
+        if var > 0:
+            sharpe = np.sqrt(252.0) * mean / np.sqrt(var)
+    return (float(growth[-1]) - 1.0 if count > 0 else 0.0), float(sharpe)
+
+if not HAVE_NUMBA:
+    # The scalar kernels would run as Python loops; the uncompiled _grid_search
+    # picks up the vectorized _eval_pair through the module globals
+    _all_smas = _all_smas_numpy
+    _eval_pair = _eval_pair_numpy
+
+# numba's default workqueue threading layer aborts the process when two threads
+# enter a parallel region at once (e.g. concurrent Streamlit sessions)
+_GRID_LOCK = threading.Lock()
+
+@njit(parallel=True, cache=True)
+def _grid_search(prices, sma, pairs, out_ret, out_sharpe):
+    """Evaluate every (fast, slow) row of ``pairs`` (as ``sma`` columns) in parallel, metrics only."""
+    no_equity = np.empty(0, dtype=prices.dtype)
+    for i in prange(pairs.shape[0]):
+        total_return, sharpe = _eval_pair(prices, sma[:, pairs[i, 0]], sma[:, pairs[i, 1]], no_equity)
+        out_ret[i] = total_return
+        out_sharpe[i] = sharpe
+
+def _grid_pairs(fast_range: Tuple[int,int], slow_range: Tuple[int,int], slow_step: int) -> np.ndarray:
     fast_start, fast_end = fast_range
     slow_start, slow_end = slow_range
+    # Start each row at the first valid slow window, so slow <= fast is never generated,
+    # and skip windows below one bar, which have no moving average (nor an SMA column)
+    return np.array(
+        [(fast, slow) for fast in range(max(fast_start, 1), fast_end + 1)
+         for slow in range(max(fast + 1, slow_start), slow_end + 1, slow_step)],
+        dtype=np.int64,
+    ).reshape(-1, 2)
+
+def find_best_edges(prices: pd.Series, fast_range: Tuple[int,int], slow_range: Tuple[int,int],
+                    coarse_step: int = 2) -> List[StrategyPerformance]:
+    fast_start, fast_end = fast_range
+    slow_start, slow_end = slow_range
+    # float32 halves the memory traffic of the scans; the kernels still accumulate in float64
+    arr = prices.to_numpy(dtype=np.float32, copy=True)
+    # Every window is averaged once and shared by all (fast, slow) pairs.
+    wmin = max(min(fast_start, slow_start), 1)
+    sma = _all_smas(arr, wmin, max(fast_end, slow_end, wmin))
+
+    def evaluate(pairs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        total_returns = np.empty(len(pairs))
+        sharpes = np.empty(len(pairs))
+        with _GRID_LOCK:
+            _grid_search(arr, sma, pairs - wmin, total_returns, sharpes)
+        return total_returns, sharpes
+
+    def rank(total_returns: np.ndarray, sharpes: np.ndarray) -> np.ndarray:
+        # Sharpe, then total return, both descending; the stable sort keeps grid order on ties
+        return np.lexsort((-total_returns, -sharpes))
+
+    # Coarse pass over every coarse_step-th slow window, then refine around the
+    # 20 best by evaluating the slow windows skipped next to them
+    pairs = _grid_pairs(fast_range, slow_range, coarse_step)
+    total_returns, sharpes = evaluate(pairs)
+    seen = set(map(tuple, pairs.tolist()))
+    refine = []
+    for fast, slow in pairs[rank(total_returns, sharpes)[:20]].tolist():
+        for neighbour in range(slow - coarse_step + 1, slow + coarse_step):
+            if max(fast + 1, slow_start) <= neighbour <= slow_end and (fast, neighbour) not in seen:
+                seen.add((fast, neighbour))
+                refine.append((fast, neighbour))
+    if refine:
+        refine_pairs = np.array(refine, dtype=np.int64)
+        refine_returns, refine_sharpes = evaluate(refine_pairs)
+        pairs = np.concatenate((pairs, refine_pairs))
+        total_returns = np.concatenate((total_returns, refine_returns))
+        sharpes = np.concatenate((sharpes, refine_sharpes))
+
+    # Only rebuild equity for the survivors
     performances: List[StrategyPerformance] = []
-    for fast in range(fast_start, fast_end + 1):
-        for slow in range(max(fast + 1, slow_start), slow_end + 1):
-            signal = moving_average_crossover_signals(prices, fast, slow)
-            equity = backtest_signals(prices, signal)
-            total_return, sharpe = compute_performance(equity)
-            performances.append(StrategyPerformance(fast, slow, total_return, sharpe, equity))
-    performances.sort(key=lambda p: (p.sharpe, p.total_return), reverse=True)
-    return performances[:10]
+    for i in rank(total_returns, sharpes)[:10]:
+        fast, slow = int(pairs[i, 0]), int(pairs[i, 1])
+        equity = np.empty_like(arr)
+        total_return, sharpe = _eval_pair(arr, sma[:, fast - wmin], sma[:, slow - wmin], equity)
+        performances.append(StrategyPerformance(fast, slow, total_return, sharpe, pd.Series(equity, index=prices.index)))
+    return performances
+
+_INPUT_RE = re.compile(r'^\s*inputs?\s*:\s*(.+)$', re.IGNORECASE)
+# Plain alternation (no word boundaries) so 'SellShort' and 'BuyToCover' still count as rules
+_RULE_RE = re.compile(r'buy|sell|short|cover', re.IGNORECASE)
 
 def analyse_powerlanguage_file(path: Path) -> str:
-    content = path.read_text(encoding='utf-8', errors='ignore')
-    lines = content.splitlines()
+    content = path.read_bytes().decode('utf-8', 'ignore')
     inputs = []
     rules = []
-    for line in lines:
-        s = line.strip()
-        if s.lower().startswith('inputs:'):
-            parts = s[len('inputs:'):].split(',')
-            for p in parts:
+    for line in content.splitlines():
+        match = _INPUT_RE.match(line)
+        if match:
+            for p in match.group(1).split(','):
                 p = p.strip().rstrip(';')
                 if '=' in p:
                     name, value = [x.strip() for x in p.split('=',1)]
                     inputs.append((name, value))
-        elif any(k in s.lower() for k in ['buy','sell','short','cover']):
-            rules.append(s)
+        elif _RULE_RE.search(line):
+            rules.append(line.strip())
     report = []
     if inputs:
         report.append('Found input parameters:')
@@ -129,8 +371,7 @@ def analyse_powerlanguage_file(path: Path) -> str:
         report.append('No obvious inputs or trading rules were detected.')
     return '\n'.join(report)
 
-def generate_powerlanguage_strategy(name: str, fast: int, slow: int) -> str:
-    return f"""
+_STRATEGY_TEMPLATE = """
 // Strategy: {name}
 Inputs: FastLength({fast}), SlowLength({slow});
 Vars: FastMA(0), SlowMA(0);
@@ -142,9 +383,15 @@ If (FastMA crosses under SlowMA) Then
     Sell (\"LongExit\") next bar at market;
 """
 
+@lru_cache(maxsize=256)
+def generate_powerlanguage_strategy(name: str, fast: int, slow: int) -> str:
+    return _STRATEGY_TEMPLATE.format(name=name, fast=fast, slow=slow)
+
 def plot_equity_curves(perfs: List[StrategyPerformance], limit: int = 5) -> None:
     plt.figure(figsize=(10,6))
     for perf in perfs[:limit]:
+        if perf.equity is None:
+            continue
         label = f'Fast {perf.fast_period} Slow {perf.slow_period}'
         plt.plot(perf.equity.index, perf.equity.values, label=label)
     plt.legend()
@@ -25,10 +25,61 @@ installato. Le funzioni qui presenti si limitano a generare codice sorgente.
 from __future__ import annotations
 
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from textwrap import dedent
 
-def generate_powerlanguage_signal(name: str, code_body: str) -> Path:
+# Commento iniziale con istruzioni di importazione, preparato una sola volta
+_HEADER_TEMPLATE = dedent(
+    """
+    // File generato automaticamente
+    // Nome del segnale: {name}
+    // Istruzioni:
+    //   - Importare questo file nell'Editor PowerLanguage (File > Importa) e spuntare
+    //     l'opzione "Compila durante l'importazione"【458576677552250†L147-L165】.
+    //   - Applicare il segnale ad un grafico storico per eseguire il backtest【844032993114593†L114-L134】.
+    //   - Per ottimizzare i parametri, aprire la finestra di ottimizzazione (Formato > Segnali > Ottimizza)
+    //     e scegliere la modalitÃ  di ricerca (esaustiva o genetica)【844032993114593†L135-L154】.
+    """
+).strip()
+
+# Template PowerLanguage: definizione di inputs e logica trading. Il dedent
+# viene eseguito una sola volta al caricamento del modulo.
+_MA_TEMPLATE = dedent(
+    """
+    // Strategia: {name}
+    inputs: FastLength({fast_length}), SlowLength({slow_length});
+
+    vars: fastMA(0), slowMA(0);
+
+    // Calcolo medie mobili esponenziali
+    fastMA = XAverage(Close, FastLength);
+    slowMA = XAverage(Close, SlowLength);
+
+    // Regole di ingresso long/short
+    if (fastMA crosses over slowMA) then
+        begin
+            buy ("LongEntry") next bar at market;
+        end;
+    if (fastMA crosses under slowMA) then
+        begin
+            sellshort ("ShortEntry") next bar at market;
+        end;
+
+    // Regole di uscita: invertendo la posizione quando avviene incrocio opposto
+    if MarketPosition = 1 and fastMA crosses under slowMA then
+        begin
+            sell ("ExitLong") next bar at market;
+        end;
+    if MarketPosition = -1 and fastMA crosses over slowMA then
+        begin
+            buytocover ("ExitShort") next bar at market;
+        end;
+    """
+).strip()
+
+def generate_powerlanguage_signal(name: str, code_body: str, out_dir: Path | None = None) -> Path:
     """Crea un file `.txt` contenente un segnale PowerLanguage.
 
     Parameters
@@ -38,6 +89,9 @@ def generate_powerlanguage_signal(name: str, code_body: str) -> Path:
     code_body : str
         Corpo del codice PowerLanguage da includere nel file. Deve includere la
         dichiarazione di inputs e il codice della strategia.
+    out_dir : Path, optional
+        Cartella in cui scrivere il file. Se omessa il file viene creato nella
+        cartella corrente.
 
     Returns
     -------
@@ -51,26 +105,39 @@ def generate_powerlanguage_signal(name: str, code_body: str) -> Path:
     PosixPath('MyStrategy.txt')
     """
     filename = f"{name}.txt"
-    path = Path(filename)
-    # Includiamo commento iniziale con istruzioni di importazione
-    header = dedent(
-        f"""
-        // File generato automaticamente
-        // Nome del segnale: {name}
-        // Istruzioni:
-        //   - Importare questo file nell'Editor PowerLanguage (File > Importa) e spuntare
-        //     l'opzione "Compila durante l'importazione"【458576677552250†L147-L165】.
-        //   - Applicare il segnale ad un grafico storico per eseguire il backtest【844032993114593†L114-L134】.
-        //   - Per ottimizzare i parametri, aprire la finestra di ottimizzazione (Formato > Segnali > Ottimizza)
-        //     e scegliere la modalitÃ  di ricerca (esaustiva o genetica)【844032993114593†L135-L154】.
-        """
-    ).strip()
-    with path.open("w", encoding="utf-8") as f:
-        f.write(header)
-        f.write("\n\n")
-        f.write(code_body.strip() + "\n")
+    path = Path(filename) if out_dir is None else Path(out_dir) / filename
+    header = _HEADER_TEMPLATE.format(name=name)
+    # Un'unica scrittura del contenuto completo invece di più chiamate a write()
+    path.write_text(f"{header}\n\n{code_body.strip()}\n", encoding="utf-8")
     return path
 
+def generate_powerlanguage_signals(pairs: list[tuple[str, str]], out_dir: Path) -> list[Path]:
+    """Crea in parallelo un file `.txt` per ciascun segnale PowerLanguage.
+
+    Parameters
+    ----------
+    pairs : list of tuple[str, str]
+        Coppie ``(name, code_body)`` come quelle accettate da
+        :func:`generate_powerlanguage_signal`.
+    out_dir : Path
+        Cartella in cui scrivere i file; viene creata se non esiste.
+
+    Returns
+    -------
+    list of Path
+        Percorsi dei file generati, nello stesso ordine di ``pairs``.
+
+    Notes
+    -----
+    Il lavoro è dominato dall'I/O su disco, durante il quale il GIL viene
+    rilasciato: un pool di thread è sufficiente a sovrapporre le scritture.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with ThreadPoolExecutor() as pool:
+        return list(pool.map(lambda pair: generate_powerlanguage_signal(*pair, out_dir=out_dir), pairs))
+
+@lru_cache(maxsize=256)
 def ma_crossover_strategy(name: str, fast_length: int, slow_length: int) -> str:
     """Genera codice PowerLanguage per una strategia di incrocio di medie mobili.
 
@@ -99,41 +166,11 @@ def ma_crossover_strategy(name: str, fast_length: int, slow_length: int) -> str:
     (impostando i valori di inizio/fine/step nella finestra di ottimizzazione
     della piattaforma). La funzione `SetCustomFitnessValue` non viene usata,
     lasciando che la piattaforma calcoli gli indici di performance predefiniti【844032993114593†L135-L156】.
+
+    Il risultato è memorizzato in cache (``functools.lru_cache``): le interfacce
+    che rigenerano la stessa strategia più volte non ricalcolano il codice.
     """
-    # Template PowerLanguage: definizione di inputs e logica trading
-    code = dedent(
-        f"""
-        // Strategia: {name}
-        inputs: FastLength({fast_length}), SlowLength({slow_length});
-
-        vars: fastMA(0), slowMA(0);
-
-        // Calcolo medie mobili esponenziali
-        fastMA = XAverage(Close, FastLength);
-        slowMA = XAverage(Close, SlowLength);
-
-        // Regole di ingresso long/short
-        if (fastMA crosses over slowMA) then
-            begin
-                buy ("LongEntry") next bar at market;
-            end;
-        if (fastMA crosses under slowMA) then
-            begin
-                sellshort ("ShortEntry") next bar at market;
-            end;
-
-        // Regole di uscita: invertendo la posizione quando avviene incrocio opposto
-        if MarketPosition = 1 and fastMA crosses under slowMA then
-            begin
-                sell ("ExitLong") next bar at market;
-            end;
-        if MarketPosition = -1 and fastMA crosses over slowMA then
-            begin
-                buytocover ("ExitShort") next bar at market;
-            end;
-        """
-    ).strip()
-    return code
+    return _MA_TEMPLATE.format(name=name, fast_length=fast_length, slow_length=slow_length)
 
 
 
@@ -0,0 +1,118 @@
+"""Consistency checks for the backtest kernels in ``definitive_app``.
+
+``find_best_edges`` runs on numba kernels when numba is installed and on
+vectorized NumPy kernels otherwise; both must agree with each other and with
+the pandas functions (``moving_average_crossover_signals``,
+``backtest_signals``, ``compute_performance``) they replace.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import definitive_app as da
+
+
+def _prices(n: int = 3000, seed: int = 0, gaps=(7, 1500)) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    prices = pd.Series(
+        100 * np.exp(np.cumsum(rng.normal(0, 0.01, n))),
+        index=pd.date_range('2020-01-01', periods=n, freq='h'),
+    )
+    prices.iloc[list(gaps)] = np.nan
+    return prices
+
+
+def _pandas_ranking(prices: pd.Series, fast_range, slow_range):
+    results = []
+    for fast in range(fast_range[0], fast_range[1] + 1):
+        for slow in range(max(fast + 1, slow_range[0]), slow_range[1] + 1):
+            signal = da.moving_average_crossover_signals(prices, fast, slow)
+            equity = da.backtest_signals(prices, signal)
+            total_return, sharpe = da.compute_performance(equity)
+            results.append((fast, slow, total_return, sharpe))
+    # Same order as find_best_edges: Sharpe, then total return, descending; stable on ties
+    results.sort(key=lambda r: (r[3], r[2]), reverse=True)
+    return results
+
+
+@pytest.fixture(params=['default', 'numpy'])
+def kernels(request, monkeypatch):
+    """Run find_best_edges on the default kernels and on the NumPy fallback."""
+    if request.param == 'numpy':
+        monkeypatch.setattr(da, '_all_smas', da._all_smas_numpy)
+        monkeypatch.setattr(da, '_eval_pair', da._eval_pair_numpy)
+        # The uncompiled grid loop looks _eval_pair up in the module globals
+        monkeypatch.setattr(da, '_grid_search', getattr(da._grid_search, 'py_func', da._grid_search))
+    return request.param
+
+
+def test_numba_and_numpy_smas_agree():
+    pytest.importorskip('numba')
+    prices = _prices().to_numpy(dtype=np.float32)
+    compiled = da._all_smas(prices, 3, 40)
+    vectorized = da._all_smas_numpy(prices, 3, 40)
+    np.testing.assert_array_equal(np.isnan(compiled), np.isnan(vectorized))
+    np.testing.assert_allclose(compiled, vectorized, rtol=1e-6)
+
+
+def test_numba_and_numpy_eval_pair_agree():
+    pytest.importorskip('numba')
+    prices = _prices().to_numpy(dtype=np.float32)
+    sma = da._all_smas_numpy(prices, 5, 40)
+    for fast, slow in [(5, 20), (7, 24), (15, 40)]:
+        compiled_equity = np.empty_like(prices)
+        vectorized_equity = np.empty_like(prices)
+        compiled = da._eval_pair(prices, sma[:, fast - 5], sma[:, slow - 5], compiled_equity)
+        vectorized = da._eval_pair_numpy(prices, sma[:, fast - 5], sma[:, slow - 5], vectorized_equity)
+        np.testing.assert_allclose(compiled, vectorized, rtol=1e-9)
+        np.testing.assert_allclose(compiled_equity, vectorized_equity, rtol=1e-6)
+        assert np.isfinite(compiled_equity).all()
+
+
+def test_sma_matches_pandas_rolling_with_gaps():
+    prices = _prices()
+    sma = da._all_smas(prices.to_numpy(dtype=np.float32), 3, 40)
+    for w in (3, 20, 40):
+        expected = prices.rolling(window=w, min_periods=w).mean().to_numpy()
+        np.testing.assert_array_equal(np.isnan(sma[:, w - 3]), np.isnan(expected))
+        np.testing.assert_allclose(sma[:, w - 3], expected, rtol=1e-5)
+
+
+@pytest.mark.parametrize('gaps', [(), (7, 1500)])
+def test_find_best_edges_matches_pandas_ranking(kernels, gaps):
+    prices = _prices(gaps=gaps)
+    expected = _pandas_ranking(prices, (5, 15), (20, 40))[:10]
+    perfs = da.find_best_edges(prices, (5, 15), (20, 40), coarse_step=1)
+    assert [(p.fast_period, p.slow_period) for p in perfs] == [(f, s) for f, s, _, _ in expected]
+    for perf, (_, _, total_return, sharpe) in zip(perfs, expected):
+        # float32 prices: metrics agree to ~1e-6 absolute
+        assert perf.total_return == pytest.approx(total_return, rel=1e-4, abs=1e-5)
+        assert perf.sharpe == pytest.approx(sharpe, rel=1e-4, abs=1e-5)
+        assert np.isfinite(perf.equity.to_numpy()).all()
+
+
+def test_window_longer_than_series(kernels):
+    prices = _prices(n=30, gaps=())
+    signal = da.moving_average_crossover_signals(prices, 5, 40)
+    assert (signal == 0).all()
+    perfs = da.find_best_edges(prices, (5, 6), (35, 40), coarse_step=1)
+    assert perfs
+    assert all(p.total_return == 0.0 and p.sharpe == 0.0 for p in perfs)
+
+
+def test_windows_below_one_bar_are_skipped(kernels):
+    prices = _prices(n=500, gaps=())
+    perfs = da.find_best_edges(prices, (0, 2), (3, 5), coarse_step=1)
+    assert perfs
+    assert all(p.fast_period >= 1 for p in perfs)
+    assert da.find_best_edges(prices, (-3, 0), (3, 5)) == []
+
+
+def test_backtest_treats_nan_signal_as_flat():
+    prices = _prices(n=50, gaps=())
+    signal = pd.Series(1.0, index=prices.index)
+    signal.iloc[0] = np.nan
+    signal.iloc[20] = np.nan
+    expected = (1 + prices.pct_change().fillna(0) * signal.shift(1).fillna(0)).cumprod()
+    np.testing.assert_allclose(da.backtest_signals(prices, signal), expected)